@@ -1,9 +1,12 @@
 from __future__ import absolute_import, unicode_literals
 import sys
 import os
+import stat
 from copy import deepcopy
 import logging
 import zipfile
+import zlib
+import uuid
 import enum
 import fs
 import fs.base
@@ -13,9 +16,10 @@ import fs.copy
 import fs.osfs
 import fs.zipfs
 import fs.tempfs
-import fs.tools
+from fs.error_tools import convert_os_errors
 from fontTools.misc.py23 import basestring, unicode, tounicode
 from ufoLib import plistlib
+from ufoLib import etree
 from ufoLib.validators import *
 from ufoLib.filenames import userNameToFileName
 from ufoLib.converters import convertUFO1OrUFO2KerningToUFO3Kerning
@@ -92,6 +96,9 @@ LAYERINFO_FILENAME = "layerinfo.plist"
 
 DEFAULT_LAYER_NAME = "public.default"
 
+# size of the blocks read when comparing new data against an existing file
+_COMPARE_CHUNK_SIZE = 64 * 1024
+
 supportedUFOFormatVersions = [1, 2, 3]
 
 
@@ -100,6 +107,27 @@ class UFOFileStructure(enum.Enum):
 	PACKAGE = "package"
 
 
+try:
+	from os import replace as _replaceFile
+except ImportError:
+	# python 2: os.rename only overwrites existing files on POSIX
+	_replaceFile = os.rename if os.name == "posix" else None
+
+# errors raised by plistlib (or the underlying XML parser) for malformed
+# property lists or unknown encodings, by the filesystem when the file
+# can't be read, or by zipfile for a corrupt entry in a .ufoz
+_PLIST_READ_ERRORS = (
+	etree.ParseError, ValueError, TypeError, LookupError, fs.errors.FSError,
+	zlib.error, zipfile.BadZipfile,
+)
+# errors raised by plistlib for objects that can't be serialized
+_PLIST_WRITE_ERRORS = (ValueError, TypeError, OverflowError)
+
+_TEMP_FILE_FLAGS = (
+	os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+)
+
+
 # --------------
 # Shared Methods
 # --------------
@@ -132,15 +160,117 @@ def _readBytesFromPath(self, path):
 		return None
 
 
+def _matchesExistingFile(self, path, data):
+	"""
+	Returns True if the file at the given path already contains data.
+	The path must be relative to the UFO's filesystem root.
+	Returns False if the file does not exist or is a directory.
+
+	The size of the existing file is checked first, so its contents are
+	only read when the sizes match, and then in fixed-size chunks so that
+	the whole file is never held in memory.
+	"""
+	try:
+		info = self.fs.getinfo(path, namespaces=["details"])
+	except fs.errors.ResourceNotFound:
+		return False
+	if info.is_dir:
+		return False
+	size = len(data)
+	try:
+		if info.size != size:
+			return False
+	except fs.errors.MissingInfoNamespace:
+		pass
+	with self.fs.openbin(path) as f:
+		offset = 0
+		while True:
+			chunk = f.read(_COMPARE_CHUNK_SIZE)
+			if not chunk:
+				return offset == size
+			end = offset + len(chunk)
+			if chunk != data[offset:end]:
+				return False
+			offset = end
+
+
+def _writeBytes(self, path, data):
+	"""
+	Write data to the file at the given path. The data can be any
+	bytes-like object (bytes, bytearray or memoryview).
+	The path must be relative to the UFO's filesystem root.
+
+	When updating an existing UFO on the local filesystem, the data is
+	written to a temporary file next to the destination, which is then
+	renamed over it, once the data has been flushed to disk. This way
+	neither an error halfway through writing nor a system crash leaves
+	a truncated file behind. Symbolic links, hard links and files
+	that aren't writable are written in place, like on other filesystems.
+	"""
+	if self._replaceExistingFiles:
+		sysPath = self._getSysPath(path)
+		if sysPath is not None:
+			with convert_os_errors("setbytes", path):
+				replaced = _writeFileAtomically(sysPath, data)
+			if replaced:
+				return
+	# unlike fs.setbytes, this also accepts bytearray and memoryview objects
+	# without copying them into a new bytes object first
+	with self.fs.openbin(path, "w") as f:
+		f.write(data)
+
+
+def _canReplaceExistingFiles(self):
+	"""
+	Returns True if _writeBytes should replace files atomically, i.e. if
+	an existing UFO is being updated on a plain OSFS (see _isOSFS). This is
+	decided once, when the object is created, rather than on every write.
+	"""
+	return (
+		self._havePreviousFile
+		and _replaceFile is not None
+		and _isOSFS(self.fs)
+	)
+
+
+def _getSysPath(self, path):
+	"""
+	Returns the system path for the given path, or None if the UFO's
+	filesystem does not map to the local one.
+	The path must be relative to the UFO's filesystem root.
+
+	The system path of each directory is resolved (and validated) by the
+	filesystem only once and then cached, so that writing many files to
+	the same directory only costs a string concatenation for each of them.
+	"""
+	directory, fileName = fs.path.split(path)
+	if fileName in ("", ".", "..") or os.sep in fileName:
+		try:
+			return self.fs.getsyspath(path)
+		except fs.errors.NoSysPath:
+			return None
+	try:
+		sysDirectory = self._sysDirectories[directory]
+	except KeyError:
+		try:
+			# store it with a trailing separator, ready to be prepended
+			sysDirectory = os.path.join(self.fs.getsyspath(directory), "")
+		except fs.errors.NoSysPath:
+			sysDirectory = None
+		self._sysDirectories[directory] = sysDirectory
+	if sysDirectory is None:
+		return None
+	return sysDirectory + fileName
+
+
 def _getPlist(self, fileName, default=None):
 	"""
 	Read a property list relative to the UFO filesystem's root.
 	Raises UFOLibError if the file is missing and default is None,
 	otherwise default is returned.
 
-	The errors that could be raised during the reading of a plist are
-	unpredictable and/or too large to list, so, a blind try: except:
-	is done. If an exception occurs, a UFOLibError will be raised.
+	If the file can't be opened, or it isn't a well-formed property list,
+	a UFOLibError will be raised.
 	"""
 	try:
 		with self.fs.open(fileName, "rb") as f:
@@ -153,8 +283,7 @@ def _getPlist(self, fileName, default=None):
 			)
 		else:
 			return default
-	except Exception as e:
-		# TODO(anthrotype): try to narrow this down a little
+	except _PLIST_READ_ERRORS as e:
 		raise UFOLibError(
 			"'%s' could not be read on %s: %s" % (fileName, self.fs, e)
 		)
@@ -170,27 +299,26 @@ def _writePlist(self, fileName, obj):
 	file at path. If so, the file is not rewritten so that the modification
 	date is preserved.
 
-	The errors that could be raised during the writing of a plist are
-	unpredictable and/or too large to list, so, a blind try: except: is done.
-	If an exception occurs, a UFOLibError will be raised.
+	If the object contains data that can't be stored in a property list,
+	a UFOLibError will be raised.
 	"""
 	if self._havePreviousFile:
 		try:
 			data = plistlib.dumps(obj)
-		except Exception as e:
+		except _PLIST_WRITE_ERRORS as e:
 			raise UFOLibError(
 				"'%s' could not be written on %s because "
 				"the data is not properly formatted: %s"
 				% (fileName, self.fs, e)
 			)
-		if self.fs.exists(fileName) and data == self.fs.getbytes(fileName):
+		if self._matchesExistingFile(fileName, data):
 			return
-		self.fs.setbytes(fileName, data)
+		self._writeBytes(fileName, data)
 	else:
 		with self.fs.openbin(fileName, mode="w") as fp:
 			try:
 				plistlib.dump(obj, fp)
-			except Exception as e:
+			except _PLIST_WRITE_ERRORS as e:
 				raise UFOLibError(
 					"'%s' could not be written on %s because "
 					"the data is not properly formatted: %s"
@@ -566,9 +694,10 @@ class UFOReader(object):
 		Read features.fea. Return a unicode string.
 		The returned string is empty if the file is missing.
 		"""
+		# fs.open doesn't translate newlines in text mode, so decoding the
+		# bytes directly gives the same text without a TextIOWrapper
 		try:
-			with self.fs.open(FEATURES_FILENAME, "r", encoding="utf-8") as f:
-				return f.read()
+			return self.fs.getbytes(FEATURES_FILENAME).decode("utf-8")
 		except fs.errors.ResourceNotFound:
 			return ""
 
@@ -688,13 +817,13 @@ class UFOReader(object):
 		This will not list directory names, only file names.
 		Thus, empty directories will be skipped.
 		"""
+		# walk the 'data' directory in a single traversal of the UFO's own
+		# filesystem (no intermediate SubFS); the Walker yields absolute paths
+		# that all share the same prefix, so a slice makes them relative
+		dataPath = "/" + DATA_DIRNAME
+		start = len(dataPath) + 1
 		try:
-			# fs Walker.files method returns "absolute" paths (in terms of the
-			# root of the 'data' SubFS), so we strip the leading '/' to make
-			# them relative
-			return [
-				p.lstrip("/") for p in self.fs.opendir(DATA_DIRNAME).walk.files()
-			]
+			return [p[start:] for p in self.fs.walk.files(dataPath)]
 		except fs.errors.ResourceError:
 			return []
 
@@ -711,9 +840,11 @@ class UFOReader(object):
 			return []
 		if validate is None:
 			validate = self._validate
-		if not self.fs.exists(IMAGES_DIRNAME):
+		try:
+			imagesInfo = self.fs.getinfo(IMAGES_DIRNAME)
+		except fs.errors.ResourceNotFound:
 			return []
-		elif not self.fs.isdir(IMAGES_DIRNAME):
+		if not imagesInfo.is_dir:
 			raise UFOLibError("The UFO contains an \"images\" file instead of a directory.")
 		result = []
 		self._imagesFS = imagesFS = self.fs.opendir(IMAGES_DIRNAME)
@@ -901,6 +1032,8 @@ class UFOWriter(object):
 		self._fileCreator = fileCreator
 		self._downConversionKerningData = None
 		self._validate = validate
+		self._sysDirectories = {}
+		self._replaceExistingFiles = self._canReplaceExistingFiles()
 		# if the file already exists, get the format version.
 		# this will be needed for up and down conversion.
 		previousFormatVersion = None
@@ -970,9 +1103,30 @@ class UFOWriter(object):
 
 	_getPlist = _getPlist
 	_writePlist = _writePlist
+	_matchesExistingFile = _matchesExistingFile
+	_writeBytes = _writeBytes
+	_getSysPath = _getSysPath
+	_canReplaceExistingFiles = _canReplaceExistingFiles
 	readBytesFromPath = _readBytesFromPath
 	getFileModificationTime = _getFileModificationTime
 
+	def _makeParentDirectories(self, path):
+		"""
+		Create the directory containing the given path, including any
+		missing intermediate directories. The path must be relative to
+		the UFO filesystem's root.
+		"""
+		parent = fs.path.dirname(path)
+		if not parent or parent == "/":
+			return
+		try:
+			# most paths in a UFO are only one level deep (e.g. 'images/a.png'),
+			# so try a single makedir before falling back to makedirs, which
+			# checks every intermediate directory
+			self.fs.makedir(parent, recreate=True)
+		except fs.errors.ResourceNotFound:
+			self.fs.makedirs(parent, recreate=True)
+
 	def copyFromReader(self, reader, sourcePath, destPath):
 		"""
 		Copy the sourcePath in the provided UFOReader to destPath
@@ -988,7 +1142,7 @@ class UFOWriter(object):
 		if self.fs.exists(destPath):
 			raise UFOLibError("A file named \"%s\" already exists." % destPath)
 		# create the destination directory if it doesn't exist
-		self.fs.makedirs(fs.path.dirname(destPath), recreate=True)
+		self._makeParentDirectories(destPath)
 		if reader.fs.isdir(sourcePath):
 			fs.copy.copy_dir(reader.fs, sourcePath, self.fs, destPath)
 		else:
@@ -997,22 +1151,47 @@ class UFOWriter(object):
 	def writeBytesToPath(self, path, data):
 		"""
 		Write bytes to a path relative to the UFO filesystem's root.
+		The data can be any bytes-like object (bytes, bytearray or memoryview).
 		If writing to an existing UFO, check to see if data matches the data
 		that is already in the file at path; if so, the file is not rewritten
 		so that the modification date is preserved.
 		If needed, the directory tree for the given path will be built.
 		"""
 		path = fsdecode(path)
-		if self._havePreviousFile:
-			if self.fs.isfile(path) and data == self.fs.getbytes(path):
-				return
+		if self._havePreviousFile and self._matchesExistingFile(path, data):
+			return
 		try:
-			self.fs.setbytes(path, data)
+			self._writeBytes(path, data)
 		except fs.errors.FileExpected:
 			raise UFOLibError("A directory exists at '%s'" % path)
 		except fs.errors.ResourceNotFound:
-			self.fs.makedirs(fs.path.dirname(path), recreate=True)
-			self.fs.setbytes(path, data)
+			self._makeParentDirectories(path)
+			self._writeBytes(path, data)
+
+	def writeBytesToPaths(self, items):
+		"""
+		Write bytes to several paths relative to the UFO filesystem's root.
+		'items' is an iterable of (path, data) tuples. This is equivalent
+		to calling writeBytesToPath for each of them, but the paths are
+		grouped by directory, so that each directory is only created (or
+		checked) once, before the files in it are written.
+		"""
+		itemsByDirectory = {}
+		for path, data in items:
+			path = fsdecode(path)
+			directory = fs.path.dirname(path)
+			itemsByDirectory.setdefault(directory, []).append((path, data))
+		# parent directories sort before their subdirectories
+		for directory in sorted(itemsByDirectory):
+			directoryItems = itemsByDirectory[directory]
+			self._makeParentDirectories(directoryItems[0][0])
+			for path, data in directoryItems:
+				if self._havePreviousFile and self._matchesExistingFile(path, data):
+					continue
+				try:
+					self._writeBytes(path, data)
+				except fs.errors.FileExpected:
+					raise UFOLibError("A directory exists at '%s'" % path)
 
 	def getFileObjectForPath(self, path, mode="w", encoding=None):
 		"""
@@ -1025,8 +1204,16 @@ class UFOWriter(object):
 		Note: The caller is responsible for closing the open file.
 		"""
 		path = fsdecode(path)
+		if encoding is None and "b" in mode:
+			# binary files don't need the extra io stream that fs.open
+			# wraps around the file returned by openbin
+			def openFile():
+				return self.fs.openbin(path, mode=mode)
+		else:
+			def openFile():
+				return self.fs.open(path, mode=mode, encoding=encoding)
 		try:
-			return self.fs.open(path, mode=mode, encoding=encoding)
+			return openFile()
 		except fs.errors.ResourceNotFound as e:
 			m = mode[0]
 			if m == "r":
@@ -1034,8 +1221,8 @@ class UFOWriter(object):
 				# however, says that this returns None if mode is 'r'
 				return None
 			elif m == "w" or m == "a" or m == "x":
-				self.fs.makedirs(fs.path.dirname(path), recreate=True)
-				return self.fs.open(path, mode=mode, encoding=encoding)
+				self._makeParentDirectories(path)
+				return openFile()
 		except fs.errors.ResourceError as e:
 			return UFOLibError(
 				"unable to open '%s' on %s: %s" % (path, self.fs, e)
@@ -1063,11 +1250,62 @@ class UFOWriter(object):
 		if removeEmptyParents:
 			parent = fs.path.dirname(path)
 			if parent:
-				fs.tools.remove_empty(self.fs, parent)
+				self._removeEmptyDirectories([parent])
 
 	# alias kept for backward compatibility with old API
 	removeFileForPath = removePath
 
+	def removePaths(self, paths, force=False, removeEmptyParents=True):
+		"""
+		Remove the files (or directories) at the given paths. The paths
+		must be relative to the UFO.
+		Raises UFOLibError if one of the paths doesn't exist.
+		If force=True, ignore non-existent paths.
+		Directories that become empty are removed after all the paths
+		have been removed, unless 'removeEmptyParents' is False. Unlike
+		calling removePath for each path, every parent directory is only
+		checked once.
+		"""
+		parents = set()
+		try:
+			for path in paths:
+				path = fsdecode(path)
+				self.removePath(path, force=force, removeEmptyParents=False)
+				parent = fs.path.dirname(path)
+				if parent:
+					parents.add(parent)
+		finally:
+			# also clean up after the paths removed before an error
+			if removeEmptyParents:
+				self._removeEmptyDirectories(parents)
+
+	def _removeEmptyDirectories(self, directories):
+		"""
+		Remove each of the given directories if it is empty, then do the
+		same for the parents of the directories that were removed. The
+		directories must be relative to the UFO.
+
+		This works bottom up, one level at a time, so each directory is
+		only checked once, and only after all of its subdirectories have
+		been dealt with.
+		"""
+		levels = {}
+		for directory in directories:
+			directory = fs.path.relpath(fs.path.normpath(directory))
+			if directory:
+				levels.setdefault(directory.count("/"), set()).add(directory)
+		if not levels:
+			return
+		for level in range(max(levels), -1, -1):
+			for directory in levels.pop(level, ()):
+				try:
+					self.fs.removedir(directory)
+				except (fs.errors.DirectoryNotEmpty, fs.errors.ResourceNotFound):
+					continue
+				if level:
+					parent = fs.path.dirname(directory)
+					levels.setdefault(level - 1, set()).add(parent)
+
 	# UFO mod time
 
 	def setModificationTime(self):
@@ -1573,8 +1811,7 @@ class UFOWriter(object):
 			# if we are updating an existing zip file, we can now compress the
 			# contents of the temporary filesystem in the destination path
 			rootDir = os.path.splitext(os.path.basename(self._path))[0] + ".ufo"
-			with fs.zipfs.ZipFS(self._path, write=True, encoding="utf-8") as destFS:
-				fs.copy.copy_fs(self.fs, destFS.makedir(rootDir))
+			_writeZipFile(self.fs, self._path, rootDir)
 		if self._shouldClose:
 			self.fs.close()
 
@@ -1609,6 +1846,82 @@ def _sniffFileStructure(ufo_path):
 		raise UFOLibError("No such file or directory: '%s'" % ufo_path)
 
 
+def _writeZipFile(sourceFS, path, rootDir):
+	"""Compress the contents of 'sourceFS' into a new zip file at the
+	system path 'path', inside a root directory named 'rootDir'.
+	'sourceFS' must map to the local filesystem, i.e. have system paths.
+
+	The archive is written in a single pass, straight from the source
+	filesystem, instead of first copying everything into the temporary
+	filesystem of a writable ZipFS.
+	"""
+	with zipfile.ZipFile(
+		path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+	) as zipFile:
+		zipFile.writestr(rootDir + "/", b"")
+		for sourcePath, _ in sourceFS.walk.info("/"):
+			# ZipFile.write streams the file from disk, and records
+			# directories with a trailing slash
+			zipFile.write(sourceFS.getsyspath(sourcePath), rootDir + sourcePath)
+
+
+def _isOSFS(filesystem):
+	"""Return True if 'filesystem' is an OSFS, or a sub-directory of one.
+
+	Other filesystems may map to the local one too (e.g. a read-only
+	wrapper around an OSFS), but writing straight to their system paths
+	would bypass whatever the wrapper is there to enforce.
+	"""
+	while isinstance(filesystem, fs.subfs.SubFS):
+		filesystem = filesystem.delegate_fs()
+	return isinstance(filesystem, fs.osfs.OSFS)
+
+
+def _writeFileAtomically(sysPath, data):
+	"""Write data to a temporary file in the same directory as the
+	system path 'sysPath', then move it in place of the destination.
+
+	The permissions of an existing destination file are kept. Returns
+	False, without writing anything, if the destination must be written
+	in place rather than replaced: a symbolic link, a file with several
+	hard links, or a file that isn't writable.
+	"""
+	try:
+		info = os.lstat(sysPath)
+	except OSError:
+		mode = None
+	else:
+		if (
+			stat.S_ISLNK(info.st_mode)
+			or info.st_nlink > 1
+			or not os.access(sysPath, os.W_OK)
+		):
+			return False
+		mode = info.st_mode
+	directory, fileName = os.path.split(sysPath)
+	tempPath = os.path.join(
+		directory, ".%s.%s.tmp" % (fileName, uuid.uuid4().hex[:8])
+	)
+	fd = os.open(tempPath, _TEMP_FILE_FLAGS, 0o666)
+	try:
+		with os.fdopen(fd, "wb") as f:
+			f.write(data)
+			# make sure the data is on disk before the rename is, or a
+			# system crash could leave an empty file in place of the old one
+			f.flush()
+			os.fsync(f.fileno())
+		if mode is not None:
+			os.chmod(tempPath, stat.S_IMODE(mode))
+		_replaceFile(tempPath, sysPath)
+	except BaseException:
+		try:
+			os.remove(tempPath)
+		except OSError:
+			pass
+		raise
+	return True
+
+
 def makeUFOPath(path):
 	"""
 	Return a .ufo pathname.
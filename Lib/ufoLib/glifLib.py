@@ -14,6 +14,7 @@ glyph data. See the class doc string for details.
 from __future__ import absolute_import, unicode_literals
 from warnings import warn
 from collections import OrderedDict
+from io import BytesIO
 import fs
 import fs.base
 import fs.errors
@@ -166,11 +167,16 @@ class GlyphSet(object):
 		self._validateWrite = validateWrite
 		self._existingFileNames = None
 		self._reverseContents = None
+		self._sysDirectories = {}
+		self._replaceExistingFiles = self._canReplaceExistingFiles()
 
 		self.rebuildContents()
 
 	# here we reuse the same methods from UFOReader/UFOWriter
-	from ufoLib import _getPlist, _writePlist, _getFileModificationTime
+	from ufoLib import (
+		_getPlist, _writePlist, _getFileModificationTime, _matchesExistingFile,
+		_writeBytes, _getSysPath, _canReplaceExistingFiles,
+	)
 
 	def rebuildContents(self, validateRead=None):
 		"""
@@ -188,12 +194,22 @@ class GlyphSet(object):
 			if not isinstance(contents, dict):
 				invalidFormat = True
 			else:
+				# list the glyph set directory once instead of probing the
+				# filesystem for every file; names that are not found in the
+				# listing (e.g. on case-insensitive filesystems) still fall
+				# back to an explicit check
+				existingFileNames = set(
+					info.name for info in self.fs.scandir("/") if not info.is_dir
+				)
 				for name, fileName in contents.items():
 					if not isinstance(name, basestring):
 						invalidFormat = True
 					if not isinstance(fileName, basestring):
 						invalidFormat = True
-					elif not self.fs.exists(fileName):
+					elif (
+						fileName not in existingFileNames
+						and not self.fs.exists(fileName)
+					):
 						raise GlifLibError(
 							"%s references a file that does not exist: %s"
 							% (CONTENTS_FILENAME, fileName)
@@ -419,13 +435,9 @@ class GlyphSet(object):
 			formatVersion=formatVersion,
 			validate=validate,
 		)
-		if (
-			self._havePreviousFile
-			and self.fs.exists(fileName)
-			and data == self.fs.getbytes(fileName)
-		):
+		if self._havePreviousFile and self._matchesExistingFile(fileName, data):
 			return
-		self.fs.setbytes(fileName, data)
+		self._writeBytes(fileName, data)
 
 	def deleteGlyph(self, glyphName):
 		"""Permanently delete the glyph from the glyph set on disk. Will
@@ -620,11 +632,14 @@ def _writeGlyphToBytes(
 	# lib
 	if getattr(glyphObject, "lib", None):
 		_writeLib(glyphObject, root, validate)
-	# return the text
-	data = _XML_DECLARATION + etree.tostring(
-		root, encoding="utf-8", xml_declaration=False, pretty_print=True
+	# return the text; the declaration and the tree are serialized into the
+	# same buffer, instead of concatenating two copies of the data
+	f = BytesIO()
+	f.write(_XML_DECLARATION)
+	etree.ElementTree(root).write(
+		f, encoding="utf-8", xml_declaration=False, pretty_print=True
 	)
-	return data
+	return f.getvalue()
 
 
 def writeGlyphToString(glyphName, glyphObject=None, drawPointsFunc=None, formatVersion=2, validate=True):
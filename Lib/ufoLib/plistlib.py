@@ -67,7 +67,10 @@ _date_parser = re.compile(
 
 def _date_from_string(s):
     order = ("year", "month", "day", "hour", "minute", "second")
-    gd = _date_parser.match(s).groupdict()
+    m = _date_parser.match(s)
+    if m is None:
+        raise ValueError("invalid date: %r" % s)
+    gd = m.groupdict()
     lst = []
     for key in order:
         val = gd[key]
@@ -221,7 +224,11 @@ def end_dict(self):
 
 
 def end_key(self):
-    if self.current_key or not isinstance(self.stack[-1], type({})):
+    if (
+        self.current_key
+        or not self.stack
+        or not isinstance(self.stack[-1], type({}))
+    ):
         raise ValueError("unexpected key")
     self.current_key = self.get_data()
 
@@ -790,6 +790,10 @@ def layerContentsValidator(value, ufoPathOrFileSystem):
 	usedLayerNames = set()
 	usedDirectories = set()
 	contents = {}
+	# list the UFO's root once rather than probing for every glyph set
+	existingDirectories = set(
+		info.name for info in fileSystem.scandir("/") if info.is_dir
+	)
 	for entry in value:
 		# layer entry in the incorrect format
 		if not isinstance(entry, list):
@@ -807,7 +811,10 @@ def layerContentsValidator(value, ufoPathOrFileSystem):
 		if len(layerName) == 0:
 			return False, "Empty layer name in layercontents.plist."
 		# directory doesn't exist
-		if not fileSystem.exists(directoryName):
+		if (
+			directoryName not in existingDirectories
+			and not fileSystem.exists(directoryName)
+		):
 			return False, "A glyphset does not exist at %s." % directoryName
 		# default layer name
 		if layerName == "public.default" and directoryName != "glyphs":
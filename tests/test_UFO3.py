@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, unicode_literals
 import os
+import stat
 import shutil
 import unittest
 import tempfile
+import fs.errors
+import fs.osfs
+import fs.wrap
 from io import open
 from fontTools.misc.py23 import unicode
 from ufoLib import UFOReader, UFOWriter, UFOLibError
@@ -3468,6 +3472,19 @@ class UFO3ReadLayersTestCase(unittest.TestCase):
 		reader = UFOReader(self.ufoPath, validate=True)
 		self.assertRaises(UFOLibError, reader.getGlyphSet)
 
+	# unreadable property list
+
+	def testInvalidPlistEncoding(self):
+		self.makeUFO()
+		path = os.path.join(self.ufoPath, "lib.plist")
+		with open(path, "wb") as f:
+			f.write(
+				b'<?xml version="1.0" encoding="UTF8x"?>\n'
+				b'<plist version="1.0"><dict/></plist>\n'
+			)
+		reader = UFOReader(self.ufoPath, validate=True)
+		self.assertRaises(UFOLibError, reader.readLib)
+
 	# layer contents invalid name format
 
 	def testInvalidLayerContentsNameFormat(self):
@@ -4248,6 +4265,176 @@ class UFO3WriteDataTestCase(unittest.TestCase):
 		self.assertEqual(testBytes, written)
 		self.tearDownUFO()
 
+	def testUFOWriterWriteBytesToPaths(self):
+		items = [
+			("data/org.unifiedfontobject.writebytespaths/a.txt", b"a"),
+			("data/org.unifiedfontobject.writebytespaths/level1/b.txt", b"b"),
+			("data/org.unifiedfontobject.writebytespaths/c.txt", b"c"),
+			("data/org.unifiedfontobject.writebytespaths/level1/level2/d.txt", b"d"),
+		]
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPaths(items)
+		for path, data in items:
+			with open(os.path.join(self.dstDir, path), "rb") as f:
+				self.assertEqual(f.read(), data)
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		# existing UFO: unchanged files are not rewritten
+		unchangedPath = os.path.join(self.dstDir, items[0][0])
+		os.utime(unchangedPath, (0, 0))
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPaths([items[0], (items[1][0], b"changed")])
+		self.assertEqual(os.path.getmtime(unchangedPath), 0)
+		with open(os.path.join(self.dstDir, items[1][0]), "rb") as f:
+			self.assertEqual(f.read(), b"changed")
+		self.assertRaises(
+			UFOLibError, writer.writeBytesToPaths, [("data", b"test")]
+		)
+		self.tearDownUFO()
+
+	def testUFOWriterWriteBytesLikeToPath(self):
+		path = "data/org.unifiedfontobject.writebyteslike.txt"
+		fullPath = os.path.join(self.dstDir, path)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, bytearray(b"test"))
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), b"test")
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		# existing UFO
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, memoryview(b"tested"))
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), b"tested")
+		self.tearDownUFO()
+
+	def testUFOWriterWriteBytesToPathUnchanged(self):
+		path = "data/org.unifiedfontobject.writebytesunchanged.bin"
+		fullPath = os.path.join(self.dstDir, path)
+		# larger than the blocks the comparison reads
+		testBytes = b"\x00\x01" * 64 * 1024
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, testBytes)
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		os.utime(fullPath, (0, 0))
+		# same data: the file is not rewritten
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, testBytes)
+		self.assertEqual(os.path.getmtime(fullPath), 0)
+		# same size, different data in the last chunk
+		changed = testBytes[:-1] + b"\x02"
+		writer.writeBytesToPath(path, changed)
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), changed)
+		# different size
+		writer.writeBytesToPath(path, b"test")
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), b"test")
+		# no temporary files are left behind
+		self.assertEqual(
+			os.listdir(os.path.dirname(fullPath)), [os.path.basename(path)]
+		)
+		# a directory is not replaced
+		self.assertRaises(UFOLibError, writer.writeBytesToPath, "data", b"test")
+		self.tearDownUFO()
+
+	@unittest.skipUnless(os.name == "posix", "requires POSIX permissions")
+	def testUFOWriterWriteBytesToPathKeepsMode(self):
+		path = "data/org.unifiedfontobject.writebytesmode.txt"
+		fullPath = os.path.join(self.dstDir, path)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, b"test")
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		os.chmod(fullPath, 0o600)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, b"changed")
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), b"changed")
+		self.assertEqual(stat.S_IMODE(os.stat(fullPath).st_mode), 0o600)
+		self.tearDownUFO()
+
+	@unittest.skipUnless(os.name == "posix", "requires POSIX permissions")
+	@unittest.skipIf(
+		hasattr(os, "geteuid") and os.geteuid() == 0,
+		"root can write to read-only files"
+	)
+	def testUFOWriterWriteBytesToPathReadOnlyFile(self):
+		path = "data/org.unifiedfontobject.writebytesreadonlyfile.txt"
+		fullPath = os.path.join(self.dstDir, path)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, b"test")
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		os.chmod(fullPath, 0o444)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		# the file's own protection is not bypassed by replacing it
+		self.assertRaises(
+			fs.errors.PermissionDenied, writer.writeBytesToPath, path, b"changed"
+		)
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), b"test")
+		os.chmod(fullPath, 0o644)
+		self.tearDownUFO()
+
+	@unittest.skipUnless(hasattr(os, "link"), "requires hard links")
+	def testUFOWriterWriteBytesToPathHardLink(self):
+		path = "data/org.unifiedfontobject.writebyteshardlink.txt"
+		fullPath = os.path.join(self.dstDir, path)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, b"a")
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		linkedPath = fullPath + ".link"
+		os.link(fullPath, linkedPath)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, b"bb")
+		# both names still refer to the same, updated file
+		self.assertTrue(os.path.samefile(fullPath, linkedPath))
+		with open(linkedPath, "rb") as f:
+			self.assertEqual(f.read(), b"bb")
+		self.tearDownUFO()
+
+	@unittest.skipUnless(hasattr(os, "symlink"), "requires symbolic links")
+	def testUFOWriterWriteFeaturesToSymlink(self):
+		linkedDir = tempfile.mkdtemp()
+		try:
+			linkedPath = os.path.join(linkedDir, "features.fea")
+			with open(linkedPath, "w", encoding="utf-8") as f:
+				f.write("# test")
+			writer = UFOWriter(self.dstDir, formatVersion=3)
+			writer.getGlyphSet()
+			writer.writeLayerContents()
+			fullPath = os.path.join(self.dstDir, "features.fea")
+			os.symlink(linkedPath, fullPath)
+			writer = UFOWriter(self.dstDir, formatVersion=3)
+			writer.writeFeatures("# changed")
+			# the link is written through, not replaced by a regular file
+			self.assertTrue(os.path.islink(fullPath))
+			with open(linkedPath, "r", encoding="utf-8") as f:
+				self.assertEqual(f.read(), "# changed")
+			self.tearDownUFO()
+		finally:
+			shutil.rmtree(linkedDir)
+
+	def testUFOWriterWriteBytesToPathReadOnly(self):
+		path = "data/org.unifiedfontobject.writebytesreadonly.txt"
+		fullPath = os.path.join(self.dstDir, path)
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		writer.writeBytesToPath(path, b"test")
+		writer.getGlyphSet()
+		writer.writeLayerContents()
+		# the fast path must not bypass a wrapper around the filesystem
+		readOnlyFS = fs.wrap.read_only(fs.osfs.OSFS(self.dstDir))
+		writer = UFOWriter(readOnlyFS, formatVersion=3)
+		self.assertRaises(
+			fs.errors.ResourceReadOnly, writer.writeBytesToPath, path, b"changed"
+		)
+		with open(fullPath, "rb") as f:
+			self.assertEqual(f.read(), b"test")
+		self.tearDownUFO()
+
 	def testUFOWriterWriteFileToPath(self):
 		# basic file
 		path = "data/org.unifiedfontobject.getwritefile.txt"
@@ -4286,6 +4473,36 @@ class UFO3WriteDataTestCase(unittest.TestCase):
 		self.assertRaises(UFOLibError, writer.removeFileForPath, path="data/org.unifiedfontobject.doesNotExist.txt")
 		self.tearDownUFO()
 
+	def testUFOWriterRemovePaths(self):
+		path1 = "data/org.unifiedfontobject.removepaths/level1/level2/file1.txt"
+		path2 = "data/org.unifiedfontobject.removepaths/level1/level2/file2.txt"
+		path3 = "data/org.unifiedfontobject.removepaths/level1/file3.txt"
+		path4 = "data/org.unifiedfontobject.removepaths/file4.txt"
+		writer = UFOWriter(self.dstDir, formatVersion=3)
+		for path in (path1, path2, path3, path4):
+			writer.writeBytesToPath(path, b"test")
+		writer.removePaths([path1, path2, path3])
+		for path in (path1, path2, path3):
+			self.assertEqual(os.path.exists(os.path.join(self.dstDir, path)), False)
+		self.assertEqual(os.path.exists(os.path.join(self.dstDir, "data/org.unifiedfontobject.removepaths/level1")), False)
+		self.assertEqual(os.path.exists(os.path.join(self.dstDir, path4)), True)
+		self.assertRaises(UFOLibError, writer.removePaths, [path1])
+		writer.removePaths([path1, path4], force=True)
+		self.assertEqual(os.path.exists(os.path.join(self.dstDir, "data")), False)
+		# sibling directories at the same level are both dealt with before
+		# their common parent
+		path5 = "data/org.unifiedfontobject.removepaths/a/file5.txt"
+		path6 = "data/org.unifiedfontobject.removepaths/b/file6.txt"
+		writer.writeBytesToPath(path5, b"test")
+		writer.writeBytesToPath(path6, b"test")
+		writer.removePaths([path5, path6])
+		self.assertEqual(os.path.exists(os.path.join(self.dstDir, "data")), False)
+		# directories emptied before a missing path is hit are removed too
+		writer.writeBytesToPath(path5, b"test")
+		self.assertRaises(UFOLibError, writer.removePaths, [path5, path6])
+		self.assertEqual(os.path.exists(os.path.join(self.dstDir, "data")), False)
+		self.tearDownUFO()
+
 	def testUFOWriterCopy(self):
 		sourceDir = self.dstDir.replace(".ufo", "") + "-copy source" + ".ufo"
 		dataPath = "data/org.unifiedfontobject.copy/level1/level2/file1.txt"
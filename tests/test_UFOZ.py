@@ -6,6 +6,8 @@ from ufoLib.errors import UFOLibError, GlifLibError
 from ufoLib import plistlib
 import sys
 import os
+import struct
+import zipfile
 import fs.osfs
 import fs.tempfs
 import fs.memoryfs
@@ -51,7 +53,33 @@ class TestUFOZ(object):
             writer.writeLib({"hello world": 123})
         with UFOReader(testufoz) as reader:
             assert reader.readLib() == {"hello world": 123}
+            assert len(reader.getGlyphSet()) > 0
 
+    def test_write_data(self, testufoz):
+        with UFOWriter(testufoz, structure="zip") as writer:
+            writer.writeBytesToPath("data/com.example/empty.txt", b"")
+            writer.writeBytesToPath("data/com.example/sub/a.txt", b"a")
+        with UFOReader(testufoz) as reader:
+            listing = reader.getDataDirectoryListing()
+            assert "com.example/empty.txt" in listing
+            assert "com.example/sub/a.txt" in listing
+            assert reader.readBytesFromPath("data/com.example/sub/a.txt") == b"a"
+
+
+    def test_read_corrupt_plist(self, testufoz):
+        # overwrite the deflated data of lib.plist with garbage
+        with zipfile.ZipFile(testufoz) as zipFile:
+            info = zipFile.getinfo("TestFont1 (UFO3).ufo/lib.plist")
+        with open(testufoz, "r+b") as f:
+            # the local file header is 30 bytes long, and ends with the
+            # lengths of the file name and extra field that follow it
+            f.seek(info.header_offset + 26)
+            fileNameLength, extraLength = struct.unpack("<HH", f.read(4))
+            f.seek(fileNameLength + extraLength, os.SEEK_CUR)
+            f.write(b"\xff" * info.compress_size)
+        with UFOReader(testufoz) as reader:
+            with pytest.raises(UFOLibError, match="could not be read"):
+                reader.readLib()
 
 def test_pathlike(testufo):
 
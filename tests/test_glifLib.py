@@ -3,12 +3,16 @@ import os
 import tempfile
 import shutil
 import unittest
+import fs.errors
+import fs.osfs
+import fs.wrap
 from io import open
 from .testSupport import getDemoFontGlyphSetPath
 from ufoLib.glifLib import (
 	GlyphSet, glyphNameToFileName, readGlyphFromString, writeGlyphToString,
 	_XML_DECLARATION,
 )
+from ufoLib.errors import GlifLibError
 
 GLYPHSETDIR = getDemoFontGlyphSetPath()
 
@@ -57,6 +61,38 @@ class GlyphSetTests(unittest.TestCase):
 		gset.rebuildContents()
 		self.assertEqual(contents, gset.contents)
 
+	def testRebuildContentsMissingFile(self):
+		dstDir = self.dstDir
+		gset = GlyphSet(dstDir, validateRead=True, validateWrite=True)
+		gset.writeGlyph("a", _Glyph(), None)
+		gset.writeGlyph("b", _Glyph(), None)
+		gset.writeContents()
+		os.remove(os.path.join(dstDir, gset.contents["b"]))
+		with self.assertRaises(GlifLibError):
+			gset.rebuildContents()
+		# the check can be skipped
+		gset.rebuildContents(validateRead=False)
+		self.assertEqual(sorted(gset.keys()), ["a", "b"])
+
+	def testWriteGlyphReadOnly(self):
+		gset = GlyphSet(self.dstDir, validateRead=True, validateWrite=True)
+		gset.writeGlyph("a", _Glyph(), None)
+		gset.writeContents()
+		glifPath = os.path.join(self.dstDir, gset.contents["a"])
+		with open(glifPath, "rb") as f:
+			data = f.read()
+		# writing through a read-only wrapper must fail, not bypass it
+		readOnlyFS = fs.wrap.read_only(fs.osfs.OSFS(self.dstDir))
+		gset = GlyphSet(
+			readOnlyFS.opendir("/"), validateRead=True, validateWrite=True
+		)
+		glyph = _Glyph()
+		glyph.width = 100
+		with self.assertRaises(fs.errors.ResourceReadOnly):
+			gset.writeGlyph("a", glyph, None)
+		with open(glifPath, "rb") as f:
+			self.assertEqual(f.read(), data)
+
 	def testReverseContents(self):
 		gset = GlyphSet(GLYPHSETDIR, validateRead=True, validateWrite=True)
 		d = {}
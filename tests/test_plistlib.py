@@ -389,6 +389,16 @@ def test_invaliddict():
             )
 
 
+def test_invalidrootkey():
+    with pytest.raises(ValueError):
+        plistlib.loads(b"<plist><key>key at the root</key></plist>")
+
+
+def test_invaliddate():
+    with pytest.raises(ValueError):
+        plistlib.loads(b"<plist><date>not a date</date></plist>")
+
+
 def test_invalidinteger():
     with pytest.raises(ValueError):
         plistlib.loads(b"<plist><integer>not integer</integer></plist>")